@@ -7,6 +7,8 @@ in his text file are naughty or nice.
 How many strings are nice?
 There are two criteria for determining if a string is nice.
 """
+import mmap
+import multiprocessing
 import re
 
 VOWEL_PATTERN = r'[aeiou]'
@@ -74,9 +76,91 @@ def n_nice(strings, is_nice):
     return sum(1 for s in strings if is_nice(s))
 
 
+def chunk_boundaries(data, chunk_size):
+    """Split a buffer into chunks ending at newline boundaries.
+
+    Args:
+      data (bytes-like): The buffer to split, e.g. a memory-mapped file.
+      chunk_size (int): Approximate size of each chunk in bytes.
+
+    Returns:
+      list of tuples: `(start, end)` offsets of each chunk.
+
+    Examples:
+      >>> chunk_boundaries(b'aaa\\nbb\\ncccc\\nd', 4)
+      [(0, 4), (4, 12), (12, 13)]
+      >>> chunk_boundaries(b'', 4)
+      []
+
+    """
+    boundaries = []
+    start = 0
+    while start < len(data):
+        end = data.find(b'\n', start + chunk_size - 1)
+        end = len(data) if end == -1 else end + 1
+        boundaries.append((start, end))
+        start = end
+    return boundaries
+
+
+def _n_nice_chunk(args):
+    """Count the nice strings in one chunk of a file, by both criteria.
+
+    Args:
+      args (tuple): `(path, start, end)` of the chunk.
+
+    Returns:
+      tuple of ints: Number of nice strings for part one and part two.
+
+    """
+    path, start, end = args
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        strings = data[start:end].decode().splitlines()
+
+    return (
+        n_nice(strings, is_nice_part_one),
+        n_nice(strings, is_nice_part_two),
+    )
+
+
+def n_nice_parallel(path, chunk_size=1 << 24, processes=None):
+    """Determine the number of nice strings in a file using multiple processes.
+
+    The file is memory-mapped and split into chunks at newline boundaries.
+    Each worker reads and classifies only its own chunk,
+    so memory use is bounded by `chunk_size` per worker.
+
+    Args:
+      path (str): Path to a file with one string per line.
+      chunk_size (int): Approximate size of each chunk in bytes.
+      processes (int): Number of worker processes, defaults to CPU count.
+
+    Returns:
+      tuple of ints: Number of nice strings for part one and part two.
+
+    """
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            boundaries = chunk_boundaries(data, chunk_size)
+
+    chunks = [(path, start, end) for start, end in boundaries]
+    with multiprocessing.Pool(processes) as pool:
+        counts = pool.imap_unordered(_n_nice_chunk, chunks)
+        totals = [sum(part) for part in zip(*counts)]
+    return tuple(totals)
+
+
 def main():
     import sys
 
+    if sys.argv[2:] == ['--parallel']:
+        for count in n_nice_parallel(sys.argv[1]):
+            print(count)
+        return
+
     with open(sys.argv[1]) as f:
         strings = f.read().splitlines()
 
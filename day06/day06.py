@@ -20,6 +20,8 @@ To defeat your neighbors this year, all you have to do is set up your lights
 by doing the instructions Santa sent you in order.
 
 """
+import multiprocessing
+import operator
 import re
 
 DATA_PATTERN = (
@@ -47,27 +49,82 @@ brightness_commands = {
     'toggle': lambda value: value + 2,
 }
 
+# used by the bitset engine
+# each command combines a row of lights with a mask of the affected lights.
+bitset_commands = {
+    'turn on': operator.or_,
+    'turn off': lambda row, mask: row & ~mask,
+    'toggle': operator.xor,
+}
+
+# used by the array engine
+# each command modifies a NumPy view of the rectangle in place.
+array_on_off_commands = {
+    'turn on': lambda cells: cells.fill(True),
+    'turn off': lambda cells: cells.fill(False),
+    'toggle': lambda cells: operator.ixor(cells, True),
+}
+
+array_brightness_commands = {
+    'turn on': lambda cells: operator.iadd(cells, 1),
+    'turn off': lambda cells: operator.isub(cells, 1).clip(0, out=cells),
+    'toggle': lambda cells: operator.iadd(cells, 2),
+}
 
-def modify_grid(grid, line, commands):
-    """Modify the grid according to the instructions in `line`.
+
+def parse_instruction(line):
+    """Parse an instruction into a tuple of (command, x1, y1, x2, y2).
 
     Args:
-      grid (list of lists of int): The light grid.
       line (str): A single instruction of the format
         '<command> <x1>,<y1> through <x2>,<y2>'.
+
+    Returns:
+      tuple: The command and the inclusive rectangle coordinates.
+
+    Examples:
+      >>> parse_instruction('toggle 0,0 through 999,0')
+      ('toggle', 0, 0, 999, 0)
+
+    """
+    command, *coordinates = re.match(DATA_PATTERN, line).groups()
+    return (command, *map(int, coordinates))
+
+
+def modify_grid(grid, instruction, commands):
+    """Modify the grid according to a parsed instruction.
+
+    Args:
+      grid (list of lists of int): The light grid.
+      instruction (tuple): (command, x1, y1, x2, y2), see `parse_instruction`.
         command can be either 'turn on', 'turn off', or 'toggle',
         (x1, y1) and (x2, y2) are rectangle point coordinates.
       commands (dict): Mapping of commands to modification functions.
 
     """
-    command, x1, y1, x2, y2 = re.match(DATA_PATTERN, line).groups()
+    command, x1, y1, x2, y2 = instruction
     modify = commands[command]
 
-    for x in range(int(x1), int(x2) + 1):
-        for y in range(int(y1), int(y2) + 1):
+    for x in range(x1, x2 + 1):
+        for y in range(y1, y2 + 1):
             grid[y][x] = modify(grid[y][x])
 
 
+def modify_array(grid, instruction, commands):
+    """Modify a NumPy light grid according to a parsed instruction.
+
+    The whole rectangle is modified with a single slice operation.
+
+    Args:
+      grid (numpy.ndarray): The light grid.
+      instruction (tuple): (command, x1, y1, x2, y2), see `parse_instruction`.
+      commands (dict): Mapping of commands to in-place array modifications.
+
+    """
+    command, x1, y1, x2, y2 = instruction
+    commands[command](grid[y1:y2 + 1, x1:x2 + 1])
+
+
 def total_brightness(grid):
     """Calculate the total brightness of the light grid.
 
@@ -83,19 +140,299 @@ def total_brightness(grid):
     return sum(sum(row) for row in grid)
 
 
+def array_engine(instructions, size=1000):
+    """Follow the instructions on NumPy light grids.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+      size (int): Width and height of the grid.
+
+    Returns:
+      tuple of ints: Number of lit lights and total brightness.
+
+    Examples:
+      >>> array_engine([('turn on', 0, 0, 2, 2), ('toggle', 1, 1, 3, 1)], 4)
+      (8, 15)
+
+    """
+    import numpy
+
+    on_off_grid = numpy.zeros((size, size), dtype=bool)
+    brightness_grid = numpy.zeros((size, size), dtype=numpy.int64)
+
+    for instruction in instructions:
+        modify_array(on_off_grid, instruction, array_on_off_commands)
+        modify_array(brightness_grid, instruction, array_brightness_commands)
+
+    return int(on_off_grid.sum()), int(brightness_grid.sum())
+
+
+def bitset_engine(instructions, size=1000):
+    """Count the lit lights on a grid of bit-packed rows.
+
+    Each row is a Python int used as a bitset, so an instruction touches
+    one word-wide mask operation per row instead of every light.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+      size (int): Width and height of the grid.
+
+    Returns:
+      int: Number of lit lights.
+
+    Examples:
+      >>> bitset_engine([('turn on', 0, 0, 2, 2), ('toggle', 1, 1, 3, 1)], 4)
+      8
+
+    """
+    grid = [0] * size
+
+    for command, x1, y1, x2, y2 in instructions:
+        modify = bitset_commands[command]
+        mask = ((1 << (x2 - x1 + 1)) - 1) << x1
+        for y in range(y1, y2 + 1):
+            grid[y] = modify(grid[y], mask)
+
+    return sum(row.bit_count() for row in grid)
+
+
+def compress(instructions):
+    """Compress the instructions' rectangles into elementary cells.
+
+    The x and y boundaries of all rectangles split the plane into cells
+    which are always modified as a whole.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+
+    Returns:
+      tuple: (xs, ys, compressed), where `xs` and `ys` are the sorted cell
+        boundaries and `compressed` are the instructions with coordinates
+        replaced by inclusive cell indices.
+
+    Examples:
+      >>> xs, ys, compressed = compress([('turn on', 0, 0, 9, 9),
+      ...                                ('toggle', 5, 0, 5, 99)])
+      >>> xs, ys
+      ([0, 5, 6, 10], [0, 10, 100])
+      >>> compressed
+      [('turn on', 0, 0, 2, 0), ('toggle', 1, 0, 1, 1)]
+
+    """
+    xs = sorted({x for _, x1, _, x2, _ in instructions for x in (x1, x2 + 1)})
+    ys = sorted({y for _, _, y1, _, y2 in instructions for y in (y1, y2 + 1)})
+    x_index = {x: i for i, x in enumerate(xs)}
+    y_index = {y: i for i, y in enumerate(ys)}
+
+    compressed = [
+        (command, x_index[x1], y_index[y1],
+         x_index[x2 + 1] - 1, y_index[y2 + 1] - 1)
+        for command, x1, y1, x2, y2 in instructions
+    ]
+    return xs, ys, compressed
+
+
+def compressed_engine(instructions):
+    """Follow the instructions on a coordinate-compressed light grid.
+
+    Runtime depends only on the number of instructions, not on the grid area,
+    and lights outside of every rectangle are never touched.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+
+    Returns:
+      tuple of ints: Number of lit lights and total brightness.
+
+    Examples:
+      >>> compressed_engine([('turn on', 0, 0, 2, 2), ('toggle', 1, 1, 3, 1)])
+      (8, 15)
+      >>> compressed_engine([('toggle', 0, 0, 999999, 999999)])
+      (1000000000000, 2000000000000)
+
+    """
+    import numpy
+
+    if not instructions:
+        return 0, 0
+
+    xs, ys, compressed = compress(instructions)
+    areas = numpy.outer(numpy.diff(ys), numpy.diff(xs))
+
+    on_off_grid = numpy.zeros(areas.shape, dtype=bool)
+    brightness_grid = numpy.zeros(areas.shape, dtype=numpy.int64)
+
+    for instruction in compressed:
+        modify_array(on_off_grid, instruction, array_on_off_commands)
+        modify_array(brightness_grid, instruction, array_brightness_commands)
+
+    return (int(areas[on_off_grid].sum()),
+            int((areas * brightness_grid).sum()))
+
+
+def reverse_engine(instructions):
+    """Count the lit lights by following the on/off instructions backwards.
+
+    The last `turn on` or `turn off` covering a light fixes its state,
+    and only the toggles after it matter. Going backwards, each cell is
+    resolved by the first such command found, flipped by the parity of the
+    toggles seen before it. Earlier instructions are skipped once every cell
+    is resolved.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+
+    Returns:
+      int: Number of lit lights.
+
+    Examples:
+      >>> reverse_engine([('turn on', 0, 0, 2, 2), ('toggle', 1, 1, 3, 1)])
+      8
+      >>> reverse_engine([('toggle', 0, 0, 9, 9), ('turn off', 0, 0, 9, 9)])
+      0
+
+    """
+    import numpy
+
+    if not instructions:
+        return 0
+
+    xs, ys, compressed = compress(instructions)
+    areas = numpy.outer(numpy.diff(ys), numpy.diff(xs))
+
+    lit = numpy.zeros(areas.shape, dtype=bool)
+    flipped = numpy.zeros(areas.shape, dtype=bool)
+    determined = numpy.zeros(areas.shape, dtype=bool)
+    unresolved = determined.size
+
+    for command, x1, y1, x2, y2 in reversed(compressed):
+        region = numpy.s_[y1:y2 + 1, x1:x2 + 1]
+        undetermined = ~determined[region]
+
+        if command == 'toggle':
+            flipped[region] ^= undetermined
+            continue
+
+        turned_on = flipped[region] ^ (command == 'turn on')
+        lit[region] |= undetermined & turned_on
+        determined[region] = True
+        unresolved -= numpy.count_nonzero(undetermined)
+        if not unresolved:
+            break
+
+    lit |= flipped & ~determined
+    return int(areas[lit].sum())
+
+
+def clip_instructions(instructions, x0, y0, x1, y1):
+    """Clip the instructions' rectangles to a tile of the grid.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+      x0, y0, x1, y1 (int): Tile boundaries, `x0 <= x < x1`, `y0 <= y < y1`.
+
+    Returns:
+      list of tuples: The instructions which overlap the tile,
+        with their rectangles clipped to it.
+
+    Examples:
+      >>> clip_instructions([('turn on', 0, 0, 9, 9),
+      ...                    ('toggle', 6, 6, 7, 7)], 0, 0, 5, 5)
+      [('turn on', 0, 0, 4, 4)]
+
+    """
+    return [
+        (command, max(ax1, x0), max(ay1, y0),
+         min(ax2, x1 - 1), min(ay2, y1 - 1))
+        for command, ax1, ay1, ax2, ay2 in instructions
+        if ax1 < x1 and ax2 >= x0 and ay1 < y1 and ay2 >= y0
+    ]
+
+
+_worker_instructions = None
+
+
+def _init_tile_worker(instructions):
+    """Store the instructions in a worker process of `tiled_engine`."""
+    global _worker_instructions
+    _worker_instructions = instructions
+
+
+def _tile_totals(tile):
+    """Replay the worker's instructions on a single tile of the grid."""
+    return compressed_engine(clip_instructions(_worker_instructions, *tile))
+
+
+def tiled_engine(instructions, size=1000, tiles_per_side=8, processes=None):
+    """Follow the instructions on tiles of the grid in multiple processes.
+
+    Lights never interact, so each tile replays the whole instruction list
+    on its own, with every rectangle clipped to the tile.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+      size (int): Width and height of the grid.
+      tiles_per_side (int): Number of tiles along each side of the grid.
+      processes (int): Number of worker processes, defaults to CPU count.
+
+    Returns:
+      tuple of ints: Number of lit lights and total brightness.
+
+    """
+    step = -(-size // tiles_per_side)
+    tiles = [
+        (x, y, min(x + step, size), min(y + step, size))
+        for y in range(0, size, step)
+        for x in range(0, size, step)
+    ]
+
+    with multiprocessing.Pool(processes, _init_tile_worker,
+                              (instructions,)) as pool:
+        totals = pool.imap_unordered(_tile_totals, tiles)
+        return tuple(sum(total) for total in zip(*totals))
+
+
+def grid_engine(instructions, size=1000):
+    """Follow the instructions on list-of-lists light grids.
+
+    Args:
+      instructions (list of tuples): Parsed instructions.
+      size (int): Width and height of the grid.
+
+    Returns:
+      tuple of ints: Number of lit lights and total brightness.
+
+    """
+    on_off_grid = [[False] * size for _ in range(size)]
+    brightness_grid = [[0] * size for _ in range(size)]
+
+    for instruction in instructions:
+        modify_grid(on_off_grid, instruction, on_off_commands)
+        modify_grid(brightness_grid, instruction, brightness_commands)
+
+    return total_brightness(on_off_grid), total_brightness(brightness_grid)
+
+
+ENGINES = {
+    'grid': grid_engine,
+    'array': array_engine,
+    'compressed': compressed_engine,
+    'bitset': lambda instructions: (bitset_engine(instructions),),
+    'reverse': lambda instructions: (reverse_engine(instructions),),
+    'tiled': tiled_engine,
+}
+
+
 def main():
     import sys
 
-    on_off_grid = [[False] * 1000 for _ in range(1000)]
-    brightness_grid = [[0] * 1000 for _ in range(1000)]
+    engine = ENGINES[sys.argv[2] if len(sys.argv) > 2 else 'grid']
 
     with open(sys.argv[1]) as f:
-        for line in f:
-            modify_grid(on_off_grid, line, on_off_commands)
-            modify_grid(brightness_grid, line, brightness_commands)
+        instructions = [parse_instruction(line) for line in f]
 
-    print(total_brightness(on_off_grid))
-    print(total_brightness(brightness_grid))
+    for total in engine(instructions):
+        print(total)
 
 
 if __name__ == '__main__':
@@ -16,6 +16,8 @@ The included instructions booklet describe how to connect the parts together:
 and then connect its output to wire `z`.
 
 """
+import collections
+import heapq
 import operator
 import re
 
@@ -89,6 +91,315 @@ def emulate_circuit(instructions, names):
     return names['a']
 
 
+def topological_order(instructions, sources=()):
+    """Order the instructions so every wire is computed after its inputs.
+
+    Args:
+      instructions (list of tuples): Instructions given by :func:`parse_line`.
+      sources (iterable): Wires whose values are already known.
+        Their instructions are left out.
+
+    Returns:
+      list of tuples: The instructions in evaluation order.
+
+    Raises:
+      ValueError: If some wires can't be computed, because they depend
+        on a wire without a source, directly or through a cycle.
+
+    Examples:
+      >>> topological_order([('NOT', ['x'], 'y'), ('IDENTITY', ['1'], 'x')])
+      [('IDENTITY', ['1'], 'x'), ('NOT', ['x'], 'y')]
+      >>> topological_order([('NOT', ['x'], 'y')], sources=['x'])
+      [('NOT', ['x'], 'y')]
+      >>> topological_order([('NOT', ['x'], 'y')])
+      Traceback (most recent call last):
+        ...
+      ValueError: can't compute wires: y
+
+    """
+    sources = set(sources)
+    gates = [instruction for instruction in instructions
+             if instruction[2] not in sources]
+
+    dependents = collections.defaultdict(list)
+    pending = {}
+    for instruction in gates:
+        op, args, dest = instruction
+        wires = [arg for arg in args
+                 if not arg.isdigit() and arg not in sources]
+        pending[dest] = len(wires)
+        for wire in wires:
+            dependents[wire].append(instruction)
+
+    ready = collections.deque(
+        instruction for instruction in gates
+        if not pending[instruction[2]]
+    )
+    order = []
+    while ready:
+        instruction = ready.popleft()
+        order.append(instruction)
+        for dependent in dependents[instruction[2]]:
+            pending[dependent[2]] -= 1
+            if not pending[dependent[2]]:
+                ready.append(dependent)
+
+    if len(order) < len(gates):
+        unresolved = sorted(dest for dest, count in pending.items() if count)
+        raise ValueError("can't compute wires: " + ', '.join(unresolved))
+    return order
+
+
+def evaluate_circuit(instructions, names):
+    """Calculate the value of every wire, computing each exactly once.
+
+    Args:
+      instructions (list of tuples): Instructions given by :func:`parse_line`.
+      names (dict): name bindings for the circuit, updated in place.
+        Wires which are already bound keep their values.
+
+    Returns:
+      dict: Values of all the wires.
+
+    Examples:
+      >>> evaluate_circuit([('NOT', ['x'], 'y'), ('IDENTITY', ['1'], 'x')], {})
+      {'x': 1, 'y': 65534}
+      >>> evaluate_circuit([('NOT', ['x'], 'a')], {'x': 1})
+      {'x': 1, 'a': 65534}
+
+    """
+    for op, args, dest in topological_order(instructions, names):
+        args = [int(arg) if arg.isdigit() else names[arg] for arg in args]
+        names[dest] = OP[op](*args)
+    return names
+
+
+def simplify_circuit(instructions, outputs=('a',), inputs=()):
+    """Fold constants, collapse wire chains and drop unused wires.
+
+    Gates whose inputs are all known are replaced by their value,
+    wires which just copy a value or another wire are replaced by it,
+    and gates which can't reach any of the `outputs` are removed.
+
+    Args:
+      instructions (list of tuples): Instructions given by :func:`parse_line`.
+      outputs (iterable): Wires whose values are needed.
+      inputs (iterable): Wires which may be overridden later,
+        so their values must not be folded into other gates.
+
+    Returns:
+      tuple: (instructions, removed), the simplified instructions
+        in evaluation order and the number of gates removed.
+
+    Examples:
+      >>> simplify_circuit([('IDENTITY', ['3'], 'b'), ('NOT', ['b'], 'c'),
+      ...                   ('IDENTITY', ['c'], 'd'), ('AND', ['d', 'e'], 'a'),
+      ...                   ('OR', ['e', 'e'], 'f'), ('IDENTITY', ['1'], 'e')])
+      ([('IDENTITY', ['0'], 'a')], 5)
+      >>> simplified, removed = simplify_circuit(
+      ...     [('IDENTITY', ['3'], 'b'), ('NOT', ['b'], 'c'),
+      ...      ('IDENTITY', ['c'], 'd'), ('AND', ['d', '5'], 'a')],
+      ...     inputs=['b'])
+      >>> simplified[-1], removed
+      (('AND', ['c', '5'], 'a'), 1)
+
+    """
+    inputs = set(inputs)
+    resolved = {}
+    rewritten = []
+    for op, args, dest in topological_order(instructions):
+        args = [resolved.get(arg, arg) for arg in args]
+        if all(arg.isdigit() for arg in args):
+            op, args = 'IDENTITY', [str(OP[op](*map(int, args)))]
+        if op == 'IDENTITY' and dest not in inputs:
+            resolved[dest] = args[0]
+        rewritten.append((op, args, dest))
+
+    needed = set(outputs)
+    simplified = []
+    for op, args, dest in reversed(rewritten):
+        if dest in needed:
+            simplified.append((op, args, dest))
+            needed.update(arg for arg in args if not arg.isdigit())
+    simplified.reverse()
+
+    return simplified, len(instructions) - len(simplified)
+
+
+def batch_evaluate(instructions, inputs):
+    """Calculate the values of every wire for many input vectors at once.
+
+    Every wire holds a NumPy `uint16` array, one value per input vector,
+    so the circuit is traversed only once and the operators wrap around
+    at 16 bits.
+
+    Args:
+      instructions (list of tuples): Instructions given by :func:`parse_line`.
+      inputs (dict): Arrays of values for some wires,
+        all of the same length. Their gates are ignored.
+
+    Returns:
+      dict: Arrays with the values of all the wires.
+
+    Examples:
+      >>> values = batch_evaluate(
+      ...     [('IDENTITY', ['1'], 'x'), ('LSHIFT', ['x', '15'], 'y'),
+      ...      ('LSHIFT', ['y', '1'], 'z'), ('NOT', ['x'], 'a')],
+      ...     {'x': [0, 1, 2]})
+      >>> values['a'].tolist(), values['z'].tolist()
+      ([65535, 65534, 65533], [0, 0, 0])
+      >>> batch_evaluate([('NOT', ['x'], 'a')], {'x': [1, 2]})['a'].tolist()
+      [65534, 65533]
+
+    """
+    import numpy
+
+    names = {wire: numpy.asarray(values, dtype=numpy.uint16)
+             for wire, values in inputs.items()}
+    shape = numpy.broadcast_shapes(*(v.shape for v in names.values()))
+
+    for op, args, dest in topological_order(instructions, names):
+        args = [numpy.uint16(arg) if arg.isdigit() else names[arg]
+                for arg in args]
+        names[dest] = OP[op](*args)
+
+    return {wire: numpy.broadcast_to(values, shape)
+            for wire, values in names.items()}
+
+
+class Circuit:
+    """A compiled circuit which remembers the values of all its wires.
+
+    Overriding wires only recomputes the wires downstream of them
+    whose inputs actually changed.
+
+    Examples:
+      >>> circuit = Circuit([('IDENTITY', ['1'], 'x'), ('NOT', ['x'], 'y'),
+      ...                    ('AND', ['y', '2'], 'z')])
+      >>> circuit['y'], circuit['z']
+      (65534, 2)
+      >>> sorted(circuit.override({'x': 2}))
+      ['x', 'y', 'z']
+      >>> circuit['y'], circuit['z']
+      (65533, 0)
+      >>> sorted(circuit.override({}))
+      ['x', 'y', 'z']
+      >>> circuit['z']
+      2
+
+      Wires without a gate are given as inputs, and can be overridden too:
+
+      >>> circuit = Circuit([('NOT', ['x'], 'a')], inputs={'x': 1})
+      >>> sorted(circuit.override({'x': 2})), circuit['a']
+      (['a', 'x'], 65533)
+      >>> circuit.override({'w': 2})
+      Traceback (most recent call last):
+        ...
+      KeyError: 'w'
+
+    """
+
+    def __init__(self, instructions, inputs=None):
+        """Compile the circuit and calculate the value of every wire.
+
+        Args:
+          instructions (list of tuples): Instructions given by
+            :func:`parse_line`.
+          inputs (dict): Values of the wires which have no gate.
+
+        """
+        self.inputs = dict(inputs or {})
+        order = topological_order(instructions, self.inputs)
+        self.gates = {dest: (op, args) for op, args, dest in order}
+        self.position = {wire: i for i, wire in enumerate(
+            [*self.inputs, *(dest for _, _, dest in order)])}
+        self.dependents = collections.defaultdict(list)
+        for op, args, dest in order:
+            for arg in args:
+                if not arg.isdigit():
+                    self.dependents[arg].append(dest)
+
+        self.values = evaluate_circuit(order, dict(self.inputs))
+        self.overrides = {}
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Compile a circuit from lines of instructions.
+
+        Args:
+          lines (iterable of str): Instructions in the format
+            accepted by :func:`parse_line`.
+
+        """
+        return cls([parse_line(line) for line in lines])
+
+    def __getitem__(self, wire):
+        return self.values[wire]
+
+    def compute(self, wire):
+        """Calculate the value of `wire` from its gate, input or override.
+
+        Args:
+          wire (str): Name of the wire.
+
+        Returns:
+          int: The wire's value, given the current values of its inputs.
+
+        """
+        if wire in self.overrides:
+            return self.overrides[wire]
+        if wire in self.inputs:
+            return self.inputs[wire]
+        op, args = self.gates[wire]
+        args = [int(arg) if arg.isdigit() else self.values[arg]
+                for arg in args]
+        return OP[op](*args)
+
+    def override(self, overrides):
+        """Replace the current overrides and update the affected wires.
+
+        Wires are recomputed in topological order, starting from the wires
+        whose overrides were added or removed, and only propagate to their
+        dependents if their value changed.
+
+        Args:
+          overrides (dict): Fixed values of some wires.
+            Wires overridden previously, but not now, go back
+            to being computed from their gates or inputs.
+
+        Returns:
+          set: Names of the wires whose value changed.
+
+        Raises:
+          KeyError: If a wire is not part of the circuit.
+
+        """
+        for wire in overrides:
+            if wire not in self.position:
+                raise KeyError(wire)
+
+        dirty = list(self.overrides.keys() | overrides.keys())
+        self.overrides = dict(overrides)
+
+        queue = [(self.position[wire], wire) for wire in dirty]
+        heapq.heapify(queue)
+        queued = set(dirty)
+        changed = set()
+        while queue:
+            _, wire = heapq.heappop(queue)
+            new_value = self.compute(wire)
+            if new_value == self.values[wire]:
+                continue
+            self.values[wire] = new_value
+            changed.add(wire)
+            for dependent in self.dependents[wire]:
+                if dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(
+                        queue, (self.position[dependent], dependent))
+        return changed
+
+
 def value(arg, names):
     """Find the value of `arg`, if known.
 
@@ -121,8 +432,11 @@ def main():
     with open(sys.argv[1]) as f:
         instructions = [parse_line(line) for line in f]
 
-    answer1 = emulate_circuit(instructions, {})
-    answer2 = emulate_circuit(instructions, {'b': answer1})
+    instructions, _ = simplify_circuit(instructions, inputs=['b'])
+    circuit = Circuit(instructions)
+    answer1 = circuit['a']
+    circuit.override({'b': answer1})
+    answer2 = circuit['a']
 
     print(answer1)
     print(answer2)
@@ -17,6 +17,9 @@ one on each line. The only escape sequences used are
     (which represents a single character with that ASCII code).
 
 """
+import re
+
+ESCAPE_PATTERN = rb'\\(x[0-9a-fA-F]{2}|.)'
 
 
 def unescaped_len(s):
@@ -69,15 +72,70 @@ def escaped_len(s):
     return len(s) + s.count('"') + s.count('\\') + 2
 
 
-def main():
-    import sys
+def scan_differences(f, chunk_size=1 << 20):
+    r"""Calculate both length differences of a file of string literals.
+
+    The file is read as bytes, in chunks, and processed one block of whole
+    lines at a time, so escapes split between chunks are handled correctly
+    and memory use doesn't depend on the file size.
+
+    Each literal's enclosing quotes take two characters of code,
+    and an escape takes one more character of code than it represents,
+    or three more for `\x` escapes.
+    Escaping a literal adds two quotes, and a backslash
+    for each of its backslashes and quotes.
+
+    Args:
+      f (binary file): File with one string literal per line.
+      chunk_size (int): Number of bytes read at once.
+
+    Returns:
+      tuple of ints: Code length minus in-memory length,
+        and escaped length minus code length.
+
+    Examples:
+      >>> import io
+      >>> scan_differences(io.BytesIO(br'''""
+      ... "abc"
+      ... "aaa\"aaa"
+      ... "\x27"'''), chunk_size=3)
+      (12, 19)
 
+    """
     difference1 = difference2 = 0
+    rest = b''
+
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        block, newline, rest = (rest + chunk).rpartition(b'\n')
+        if not newline:
+            continue
+        d1, d2 = _block_differences(block)
+        difference1 += d1
+        difference2 += d2
+
+    if rest:
+        d1, d2 = _block_differences(rest)
+        difference1 += d1
+        difference2 += d2
+
+    return difference1, difference2
+
+
+def _block_differences(block):
+    """Calculate both length differences of a block of whole lines."""
+    literals = block.count(b'\n') + 1
+    escapes = re.findall(ESCAPE_PATTERN, block)
+    return (
+        2 * literals + sum(len(escape) for escape in escapes),
+        2 * literals + block.count(b'"') + block.count(b'\\'),
+    )
+
+
+def main():
+    import sys
 
-    with open(sys.argv[1]) as f:
-        for line in f:
-            difference1 += len(line) - unescaped_len(line)
-            difference2 += escaped_len(line) - len(line)
+    with open(sys.argv[1], 'rb') as f:
+        difference1, difference2 = scan_differences(f)
 
     print(difference1)
     print(difference2)
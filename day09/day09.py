@@ -11,8 +11,10 @@ once. What is the shortest distance he can travel to achieve this?
 Part 2 - What is the distance of the longest route?
 
 """
+import multiprocessing
+import time
 from collections import defaultdict
-from itertools import permutations
+from itertools import combinations, permutations
 
 
 def path(towns, distances):
@@ -60,9 +62,407 @@ def path(towns, distances):
     return distance
 
 
+def distance_matrix(distances):
+    """Index the towns and build a dense matrix of distances between them.
+
+    Args:
+      distances (dict of dict): Mapping the distance between each two cities.
+
+    Returns:
+      tuple: (towns, matrix), where `matrix[i][j]` is the distance between
+        `towns[i]` and `towns[j]`.
+
+    Raises:
+      KeyError: If the distance between two towns is missing.
+
+    Examples:
+      >>> distance_matrix({'A': {'B': 3}, 'B': {'A': 3}})
+      (['A', 'B'], [[0, 3], [3, 0]])
+
+    """
+    towns = sorted(distances)
+    matrix = [[distances[town1][town2] if town1 != town2 else 0
+               for town2 in towns]
+              for town1 in towns]
+    return towns, matrix
+
+
+def held_karp(matrix, reconstruct=True):
+    """Find the shortest path through every town using bitmask DP.
+
+    `cost[visited, last]` is the length of the shortest path visiting
+    the set of towns in the bitmask `visited` and ending in `last`.
+    Sets are processed by size, and each is extended by every town
+    in one vectorized step, which takes O(n^2 * 2^n) time overall.
+
+    Args:
+      matrix (list of lists): Distances between towns, see `distance_matrix`.
+      reconstruct (bool): Whether to walk back through the table
+        to recover the path, and not only its length.
+
+    Returns:
+      tuple: (distance, order), the length of the shortest path
+        and the indices of the towns along it, or None for the order
+        if it isn't reconstructed.
+
+    Examples:
+      >>> held_karp([[0, 464, 518], [464, 0, 141], [518, 141, 0]])
+      (605, [2, 1, 0])
+      >>> held_karp([[0, 464, 518], [464, 0, 141], [518, 141, 0]],
+      ...           reconstruct=False)
+      (605, None)
+      >>> held_karp([])
+      (0, [])
+
+    """
+    import numpy
+
+    n = len(matrix)
+    if not n:
+        return 0, [] if reconstruct else None
+    matrix = numpy.array(matrix, dtype=numpy.int64).reshape(n, n)
+    towns = numpy.arange(n)
+    full = (1 << n) - 1
+
+    visited_count = numpy.zeros(full + 1, dtype=numpy.int64)
+    for town in towns:
+        visited_count[1 << town:2 << town] = visited_count[:1 << town] + 1
+    masks = numpy.arange(full + 1)
+
+    unreachable = numpy.iinfo(numpy.int64).max // 2
+    cost = numpy.full((full + 1, n), unreachable, dtype=numpy.int64)
+    cost[1 << towns, towns] = 0
+    for size in range(2, n + 1):
+        layer = masks[visited_count == size]
+        for last in towns:
+            ends = layer[(layer >> last) & 1 == 1]
+            previous = cost[ends ^ (1 << last)] + matrix[:, last]
+            cost[ends, last] = previous.min(axis=1)
+
+    last = int(cost[full].argmin())
+    distance = int(cost[full, last])
+    if not reconstruct:
+        return distance, None
+
+    # walk back from the best final town to recover the path
+    order = [last]
+    visited = full
+    while visited != 1 << last:
+        remaining = cost[visited, last] - matrix[:, last]
+        visited ^= 1 << last
+        last = int(numpy.flatnonzero(
+            (cost[visited] == remaining) & ((visited >> towns) & 1 == 1))[0])
+        order.append(last)
+
+    return distance, order[::-1]
+
+
+def held_karp_routes(distances):
+    """Find the shortest and the longest route with `held_karp`.
+
+    The longest route is the shortest one with all distances negated.
+
+    Args:
+      distances (dict of dict): Mapping the distance between each two cities.
+
+    Returns:
+      tuple: (shortest, longest), each as (distance, towns).
+
+    """
+    towns, matrix = distance_matrix(distances)
+    shortest, shortest_order = held_karp(matrix)
+    longest, longest_order = held_karp([[-d for d in row] for row in matrix])
+    return (
+        (shortest, [towns[i] for i in shortest_order]),
+        (-longest, [towns[i] for i in longest_order]),
+    )
+
+
+def brute_force_routes(distances):
+    """Find the shortest and the longest route by trying every permutation.
+
+    Args:
+      distances (dict of dict): Mapping the distance between each two cities.
+
+    Returns:
+      tuple: (shortest, longest), each as (distance, towns).
+
+    """
+    all_paths = [(path(towns, distances), list(towns))
+                 for towns in permutations(distances)]
+    return min(all_paths), max(all_paths)
+
+
+_worker_matrix = None
+
+
+def _init_shard_worker(matrix):
+    """Store the distance matrix in a worker process of `sharded_routes`."""
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _shard_extremes(ends):
+    """Find the shortest and the longest route between two given towns.
+
+    Args:
+      ends (tuple): Indices of the first and the last town.
+
+    Returns:
+      tuple: (shortest, longest), each as (distance, order).
+
+    """
+    first, last = ends
+    matrix = _worker_matrix
+    middle = [town for town in range(len(matrix)) if town not in ends]
+
+    shortest = longest = None
+    for inner in permutations(middle):
+        order = (first, *inner, last)
+        distance = sum(matrix[town1][town2]
+                       for town1, town2 in zip(order, order[1:]))
+        if shortest is None or distance < shortest[0]:
+            shortest = distance, order
+        if longest is None or distance > longest[0]:
+            longest = distance, order
+    return shortest, longest
+
+
+def sharded_routes(distances, processes=None):
+    """Find the shortest and the longest route by brute force in parallel.
+
+    Permutations are sharded by their first and last town, and only
+    shards where the first town comes before the last one are searched,
+    since every route is as long as its reverse.
+
+    Args:
+      distances (dict of dict): Mapping the distance between each two cities.
+      processes (int): Number of worker processes, defaults to CPU count.
+
+    Returns:
+      tuple: (shortest, longest), each as (distance, towns).
+
+    """
+    towns, matrix = distance_matrix(distances)
+    if len(towns) < 2:
+        return (0, towns), (0, towns)
+
+    with multiprocessing.Pool(processes, _init_shard_worker,
+                              (matrix,)) as pool:
+        shards = pool.map(_shard_extremes, combinations(range(len(towns)), 2))
+
+    (shortest, shortest_order), _ = min(shards, key=lambda shard: shard[0])
+    _, (longest, longest_order) = max(shards, key=lambda shard: shard[1])
+    return (
+        (shortest, [towns[i] for i in shortest_order]),
+        (longest, [towns[i] for i in longest_order]),
+    )
+
+
+def spanning_tree_weight(matrix):
+    """Calculate the weight of the minimum spanning tree with Prim's algorithm.
+
+    Every path through all the towns is a spanning tree, so this is
+    a lower bound on the length of the shortest one.
+
+    Args:
+      matrix (list of lists): Distances between towns, see `distance_matrix`.
+
+    Returns:
+      int: Total weight of the tree's edges.
+
+    Examples:
+      >>> spanning_tree_weight([[0, 464, 518], [464, 0, 141], [518, 141, 0]])
+      605
+
+    """
+    n = len(matrix)
+    outside = set(range(1, n))
+    nearest = list(matrix[0]) if n else []
+    weight = 0
+    while outside:
+        town = min(outside, key=nearest.__getitem__)
+        outside.remove(town)
+        weight += nearest[town]
+        for other in outside:
+            nearest[other] = min(nearest[other], matrix[town][other])
+    return weight
+
+
+def nearest_neighbor(matrix, start):
+    """Build a path by always going to the nearest unvisited town.
+
+    Args:
+      matrix (list of lists): Distances between towns, see `distance_matrix`.
+      start (int): Index of the first town.
+
+    Returns:
+      list: Indices of the towns along the path.
+
+    """
+    order = [start]
+    unvisited = set(range(len(matrix))) - {start}
+    while unvisited:
+        row = matrix[order[-1]]
+        town = min(unvisited, key=row.__getitem__)
+        unvisited.remove(town)
+        order.append(town)
+    return order
+
+
+def two_opt(tour, matrix, deadline):
+    """Shorten a closed tour in place by reversing some of its segments.
+
+    Args:
+      tour (list): Indices of the towns along the tour.
+      matrix (list of lists): Distances between towns.
+      deadline (float): `time.monotonic()` value at which to stop.
+
+    Returns:
+      bool: True if the tour was improved.
+
+    """
+    improved = False
+    n = len(tour)
+    for i in range(n - 2):
+        if time.monotonic() > deadline:
+            break
+        for j in range(i + 2, n if i else n - 1):
+            a, b = tour[i], tour[i + 1]
+            c, d = tour[j], tour[(j + 1) % n]
+            if matrix[a][c] + matrix[b][d] < matrix[a][b] + matrix[c][d]:
+                tour[i + 1:j + 1] = tour[j:i:-1]
+                improved = True
+    return improved
+
+
+def or_opt(tour, matrix, deadline):
+    """Shorten a closed tour in place by moving segments of 1-3 towns.
+
+    Args:
+      tour (list): Indices of the towns along the tour.
+      matrix (list of lists): Distances between towns.
+      deadline (float): `time.monotonic()` value at which to stop.
+
+    Returns:
+      bool: True if the tour was improved.
+
+    """
+    improved = False
+    for length in (1, 2, 3):
+        for i in range(1, len(tour) - length):
+            if time.monotonic() > deadline:
+                return improved
+            segment = tour[i:i + length]
+            rest = tour[:i] + tour[i + length:]
+            first, last = segment[0], segment[-1]
+            before, after = tour[i - 1], tour[i + length]
+            gain = (matrix[before][first] + matrix[last][after] -
+                    matrix[before][after])
+
+            for k, town1 in enumerate(rest):
+                if k == i - 1:
+                    continue
+                town2 = rest[(k + 1) % len(rest)]
+                removed = matrix[town1][town2]
+                forward = matrix[town1][first] + matrix[last][town2] - removed
+                backward = matrix[town1][last] + matrix[first][town2] - removed
+                if min(forward, backward) < gain:
+                    if backward < forward:
+                        segment.reverse()
+                    tour[:] = rest[:k + 1] + segment + rest[k + 1:]
+                    improved = True
+                    break
+    return improved
+
+
+def local_search(matrix, time_budget):
+    """Find a short path through every town with local search.
+
+    Nearest neighbor paths are improved by 2-opt and Or-opt moves until
+    neither helps or the time runs out. An extra town at zero distance
+    from all the others turns paths into closed tours.
+
+    Args:
+      matrix (list of lists): Distances between towns, see `distance_matrix`.
+      time_budget (float): Number of seconds to spend.
+
+    Returns:
+      tuple: (distance, order), the length of the path found
+        and the indices of the towns along it.
+
+    """
+    n = len(matrix)
+    deadline = time.monotonic() + time_budget
+    construction_deadline = time.monotonic() + time_budget / 4
+
+    best = None
+    for start in range(n):
+        order = nearest_neighbor(matrix, start)
+        distance = sum(matrix[town1][town2]
+                       for town1, town2 in zip(order, order[1:]))
+        if best is None or distance < best[0]:
+            best = distance, order
+        if time.monotonic() > construction_deadline:
+            break
+    if best is None:
+        return 0, []
+
+    extended = [row + [0] for row in matrix] + [[0] * (n + 1)]
+    tour = [n] + best[1]
+    while (two_opt(tour, extended, deadline) |
+           or_opt(tour, extended, deadline)):
+        if time.monotonic() > deadline:
+            break
+
+    split = tour.index(n)
+    order = tour[split + 1:] + tour[:split]
+    distance = sum(matrix[town1][town2]
+                   for town1, town2 in zip(order, order[1:]))
+    return distance, order
+
+
+def heuristic_routes(distances, time_budget=2.0):
+    """Approximate the shortest and the longest route with local search.
+
+    Each result comes with a bound from a spanning tree, since every route
+    is one: the shortest route is at least as long as the minimum spanning
+    tree, and the longest is at most as long as the maximum spanning tree.
+
+    Args:
+      distances (dict of dict): Mapping the distance between each two cities.
+      time_budget (float): Number of seconds to spend on both routes.
+
+    Returns:
+      tuple: (shortest, longest), each as (distance, towns, bound).
+
+    """
+    towns, matrix = distance_matrix(distances)
+    negated = [[-distance for distance in row] for row in matrix]
+
+    shortest, shortest_order = local_search(matrix, time_budget / 2)
+    longest, longest_order = local_search(negated, time_budget / 2)
+    return (
+        (shortest, [towns[i] for i in shortest_order],
+         spanning_tree_weight(matrix)),
+        (-longest, [towns[i] for i in longest_order],
+         -spanning_tree_weight(negated)),
+    )
+
+
+SOLVERS = {
+    'brute-force': brute_force_routes,
+    'held-karp': held_karp_routes,
+    'sharded': sharded_routes,
+    'heuristic': heuristic_routes,
+}
+
+
 def main():
     import sys
 
+    solve = SOLVERS[sys.argv[2] if len(sys.argv) > 2 else 'brute-force']
+
     distances = defaultdict(dict)
 
     with open(sys.argv[1]) as f:
@@ -72,10 +472,8 @@ def main():
             distances[town1][town2] = int(distance)
             distances[town2][town1] = int(distance)
 
-    all_paths = [path(towns, distances) for towns in permutations(distances)]
-
-    print(min(all_paths))
-    print(max(all_paths))
+    for route in solve(distances):
+        print(route[0])
 
 if __name__ == '__main__':
     main()
@@ -6,8 +6,21 @@ making sequences by reading aloud the previous sequence and using that
 reading as the next sequence. For example, `211` is read as
 "one two, two ones", which becomes `1221`.
 
+Conway showed that, from the second step on, every sequence can be split
+into elements which never interact with each other again. Apart from a few
+transient ones, every element decays into a combination of the same 92
+common elements, so lengths can be calculated by counting elements
+instead of building the sequence.
+
 """
-from itertools import groupby
+import functools
+from collections import Counter
+from itertools import groupby, islice
+
+# how many steps, and how long a prefix of the right part at first,
+# to follow when checking if a sequence splits
+SPLIT_HORIZON = 25
+SPLIT_PREFIX = 20
 
 
 def look_and_say(s):
@@ -44,20 +57,421 @@ def look_and_say(s):
     return ''.join(parts)
 
 
-def main():
-    import sys
+def to_runs(s):
+    """Run-length encode a sequence into NumPy arrays.
+
+    Args:
+      s (str): An element of the look-and-say.
+
+    Returns:
+      tuple: (counts, digits), arrays with the length and the digit
+        of each run. Unless some run is longer than 255, they are `uint8`.
+
+    Examples:
+      >>> counts, digits = to_runs('111221')
+      >>> counts.tolist(), digits.tolist()
+      ([3, 2, 1], [1, 2, 1])
+      >>> from_runs(to_runs(''))
+      ''
+
+    """
+    import numpy
+
+    said = numpy.frombuffer(s.encode(), dtype=numpy.uint8) - ord('0')
+    return _encode_runs(said)
+
+
+def _encode_runs(said):
+    """Run-length encode an array of digits."""
+    import numpy
+
+    if not len(said):
+        return numpy.zeros(0, dtype=numpy.uint8), said
+    starts = numpy.flatnonzero(numpy.diff(said)) + 1
+    bounds = numpy.concatenate(([0], starts, [len(said)]))
+    counts = numpy.diff(bounds)
+    counts = counts.astype(numpy.min_scalar_type(counts.max()))
+    return counts, said[bounds[:-1]]
+
+
+def from_runs(runs):
+    """Decode a run-length encoded sequence.
+
+    Args:
+      runs (tuple): (counts, digits), see :func:`to_runs`.
+
+    Returns:
+      str: The sequence.
+
+    Examples:
+      >>> from_runs(to_runs('111221'))
+      '111221'
+
+    """
+    import numpy
+
+    counts, digits = runs
+    return (numpy.repeat(digits, counts) + ord('0')).tobytes().decode()
+
+
+def next_runs(runs):
+    """Generate the next element of the look-and-say from its runs.
+
+    Every run is read as its count followed by its digit,
+    and the resulting digits are encoded into runs again.
+
+    Args:
+      runs (tuple): (counts, digits), see :func:`to_runs`.
+
+    Returns:
+      tuple: (counts, digits) of the next element.
+
+    Examples:
+      >>> from_runs(next_runs(to_runs('111221')))
+      '312211'
+
+    """
+    import numpy
+
+    counts, digits = runs
+    if len(counts) and counts.max() > 9:
+        # counts only take more than one digit in a starting sequence
+        return to_runs(look_and_say(from_runs(runs)))
+
+    said = numpy.empty(2 * len(counts), dtype=numpy.uint8)
+    said[0::2] = counts
+    said[1::2] = digits
+    return _encode_runs(said)
 
-    sequence = sys.argv[1]
 
-    for _ in range(40):
-        sequence = look_and_say(sequence)
+def generation_lengths(s):
+    """Generate the lengths of the successive elements of the look-and-say.
 
-    print(len(sequence))
+    Only the runs of the current element are kept in memory.
+
+    Args:
+      s (str): Initial element of the look-and-say.
+
+    Yields:
+      int: Length of `s`, then of each following element.
+
+    Examples:
+      >>> from itertools import islice
+      >>> list(islice(generation_lengths('1'), 6))
+      [1, 2, 2, 4, 6, 6]
+
+    """
+    runs = to_runs(s)
+    while True:
+        yield int(runs[0].sum(dtype=int))
+        runs = next_runs(runs)
+
+
+def splits(digit, right):
+    """Determine if a sequence splits permanently in front of `right`.
+
+    The left part always ends with the same digit, so the two parts
+    evolve independently as long as the right part never starts with it.
+
+    Args:
+      digit (str): Last digit of the left part.
+      right (str): The right part.
+
+    Returns:
+      bool: True if the parts never interact.
+
+    Examples:
+      >>> splits('2', '11')
+      False
+      >>> splits('2', '3')
+      True
+      >>> splits('3', '9' * 22 + '3')
+      True
+
+    """
+    limit = SPLIT_PREFIX
+    while True:
+        split = _splits_within(digit, right, limit)
+        if split is not None:
+            return split
+        limit *= 2
+
+
+def _splits_within(digit, right, limit):
+    """Follow at most `limit` digits of the right part, see :func:`splits`.
+
+    Returns None if the prefix is a single run, and so tells nothing.
+    """
+    for _ in range(SPLIT_HORIZON):
+        if right[0] == digit:
+            return False
+        if len(right) > limit:
+            # the last run of the prefix may continue past it
+            right = right[:limit].rstrip(right[limit - 1])
+            if not right:
+                return None
+        right = look_and_say(right)
+    return True
+
+
+def split_elements(s):
+    """Split a sequence into elements which evolve independently.
+
+    Args:
+      s (str): An element of the look-and-say, at least two steps old.
+
+    Returns:
+      list of str: The elements, in order.
+
+    Examples:
+      >>> split_elements('22')
+      ['22']
+      >>> split_elements('1321132132211331121321133112')
+      ['1321132', '13221133112', '1321133112']
+
+    """
+    elements = []
+    start = 0
+    for i in range(1, len(s)):
+        if s[i] != s[i - 1] and splits(s[i - 1], s[i:]):
+            elements.append(s[start:i])
+            start = i
+    elements.append(s[start:])
+    return elements
+
+
+@functools.lru_cache(maxsize=None)
+def element_products(element):
+    """Find the elements an element decays into in one step, in order.
+
+    Args:
+      element (str)
+
+    Returns:
+      tuple of str: The elements of the next step.
+
+    Examples:
+      >>> element_products('1321133112')
+      ('11131', '22', '12', '32112')
+
+    """
+    return tuple(split_elements(look_and_say(element)))
+
+
+@functools.lru_cache(maxsize=None)
+def element_decay(element):
+    """Find the elements an element decays into in one step.
+
+    Args:
+      element (str)
+
+    Returns:
+      Counter: Number of times each element appears in the next step.
+
+    """
+    return Counter(element_products(element))
+
+
+def decay_table(elements):
+    """Build the sparse decay matrix of all elements reachable from `elements`.
+
+    Args:
+      elements (iterable of str)
+
+    Returns:
+      dict: Mapping of each element to its `element_decay`.
+
+    """
+    table = {}
+    pending = list(elements)
+    while pending:
+        element = pending.pop()
+        if element not in table:
+            table[element] = element_decay(element)
+            pending.extend(table[element])
+    return table
+
+
+def decay_step(counts, table):
+    """Advance element counts by one step of the look-and-say.
+
+    Args:
+      counts (dict): Number of times each element appears.
+      table (dict): Decay matrix given by :func:`decay_table`.
+
+    Returns:
+      Counter: Number of times each element appears in the next step.
+
+    """
+    decayed = Counter()
+    for element, count in counts.items():
+        for product, times in table[element].items():
+            decayed[product] += count * times
+    return decayed
+
+
+def sequence_length(s, steps):
+    """Calculate the length of the sequence after `steps` steps.
+
+    The sequence is built for the first two steps and then split
+    into elements, which are only counted from then on.
+
+    Args:
+      s (str): Initial element of the look-and-say.
+      steps (int)
+
+    Returns:
+      int: Length of the sequence.
+
+    Examples:
+      >>> sequence_length('1', 5)
+      6
+      >>> sequence_length('1' + '9' * 22 + '3', 0)
+      24
+      >>> sequence_length('1113122113', 40)
+      360154
+      >>> sequence_length('1113122113', 50)
+      5103798
+
+    """
+    for _ in range(min(steps, 2)):
+        s = look_and_say(s)
+    if steps < 2:
+        return len(s)
+    counts = Counter(split_elements(s))
+    table = decay_table(counts)
+
+    for _ in range(steps - 2):
+        counts = decay_step(counts, table)
+
+    return sum(len(element) * count for element, count in counts.items())
+
+
+_element_lengths = {}
+
+
+def element_length(element, depth):
+    """Calculate the length an element grows to after `depth` steps.
+
+    Lengths are cached for every (element, depth) pair. They are calculated
+    bottom-up, without recursion, so any depth can be used.
+
+    Args:
+      element (str)
+      depth (int)
+
+    Returns:
+      int: Length of the sequence `element` becomes.
+
+    Examples:
+      >>> element_length('22', 100)
+      2
+      >>> element_length('3', 4)
+      6
+
+    """
+    pending = [(element, depth)]
+    while pending:
+        element, depth = key = pending[-1]
+        if key in _element_lengths:
+            pending.pop()
+        elif not depth:
+            _element_lengths[key] = len(element)
+        else:
+            children = [(product, depth - 1)
+                        for product in element_products(element)]
+            missing = [child for child in children
+                       if child not in _element_lengths]
+            if missing:
+                pending.extend(missing)
+            else:
+                _element_lengths[key] = sum(
+                    _element_lengths[child] for child in children)
+    return _element_lengths[key]
+
+
+def sequence_window(s, steps, start, length):
+    """Get part of the sequence after `steps` steps without building it.
+
+    Only the elements covering the window are expanded, and the lengths
+    of the others are looked up, so this takes about O(steps) time
+    for a short window.
+
+    Args:
+      s (str): Initial element of the look-and-say.
+      steps (int)
+      start (int): Index of the first digit of the window.
+      length (int): Number of digits in the window.
+
+    Returns:
+      str: The digits of the window. It is shorter than `length`
+        if it goes past the end of the sequence.
+
+    Examples:
+      >>> sequence_window('1', 5, 2, 3)
+      '221'
+      >>> sequence_window('1' + '9' * 22 + '3', 1, 2, 4)
+      '2291'
+      >>> sequence_window('1113122113', 50, 5103790, 100)
+      '13322113'
+
+    """
+    for _ in range(min(steps, 2)):
+        s = look_and_say(s)
+    stop = start + length
+    if steps < 2:
+        return s[start:stop]
+    depth = steps - 2
+
+    window = []
+    offset = 0
+    pending = [(element, depth) for element in reversed(split_elements(s))]
+    while pending and offset < stop:
+        element, depth = pending.pop()
+        size = element_length(element, depth)
+        if offset + size <= start:
+            offset += size
+        elif not depth:
+            window.append(element[max(start - offset, 0):stop - offset])
+            offset += size
+        else:
+            pending.extend((product, depth - 1)
+                           for product in reversed(element_products(element)))
+    return ''.join(window)
+
+
+def digit_at(s, steps, index):
+    """Get a single digit of the sequence after `steps` steps.
+
+    Args:
+      s (str): Initial element of the look-and-say.
+      steps (int)
+      index (int): Index of the digit.
+
+    Returns:
+      str: The digit.
+
+    Raises:
+      IndexError: If the sequence is not that long.
+
+    Examples:
+      >>> digit_at('1113122113', 50, 0)
+      '1'
+
+    """
+    digit = sequence_window(s, steps, index, 1)
+    if not digit:
+        raise IndexError('sequence index out of range')
+    return digit
+
+
+def main():
+    import sys
 
-    for _ in range(10):
-        sequence = look_and_say(sequence)
+    lengths = list(islice(generation_lengths(sys.argv[1]), 51))
 
-    print(len(sequence))
+    print(lengths[40])
+    print(lengths[50])
 
 
 if __name__ == '__main__':
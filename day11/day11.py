@@ -17,11 +17,22 @@ wrap around.
 Given Santa's current password, what should his next password be?
 
 """
+import functools
 import re
+from itertools import islice
 from string import ascii_lowercase
 
 TWO_PAIR_RE = r'(.)\1.*(.)\2'
 
+ALLOWED_LETTERS = ''.join(c for c in ascii_lowercase if c not in 'iol')
+
+# (last letter, length of the straight ending with it, number of pairs,
+#  whether the last letter can still start a pair, whether there's a straight)
+START_STATE = (None, 0, 0, False, False)
+
+# `aabcc` makes any password valid, so longer suffixes can always be completed
+ALWAYS_COMPLETABLE = 5
+
 
 def create_next_letters():
     """Create the dict mapping each letter to the next one, while skipping
@@ -49,7 +60,7 @@ def substrings(s, lenght=1):
       str: Substrings of s.
 
     """
-    for i in range(len(s) - lenght):
+    for i in range(len(s) - lenght + 1):
         yield s[i:i + lenght]
 
 
@@ -145,14 +156,253 @@ def next_valid_password(password, next_letters):
             return password
 
 
+def advance(state, letter):
+    """Update the state of the password rules after appending a letter.
+
+    Pairs are matched greedily from the left, which finds as many
+    non-overlapping pairs as possible.
+
+    Args:
+      state (tuple): State of the password so far, see `START_STATE`.
+      letter (str): The appended letter.
+
+    Returns:
+      tuple: State of the extended password.
+
+    Examples:
+      >>> state = START_STATE
+      >>> for letter in 'aabcc':
+      ...     state = advance(state, letter)
+      >>> state
+      ('c', 1, 2, False, True)
+
+    """
+    last, straight_length, pairs, pair_open, straight = state
+
+    if last is not None and ord(letter) == ord(last) + 1:
+        straight_length = min(straight_length + 1, 3)
+    else:
+        straight_length = 1
+
+    if pair_open and letter == last:
+        pairs, pair_open = min(pairs + 1, 2), False
+    else:
+        pair_open = True
+
+    return (letter, straight_length, pairs, pair_open,
+            straight or straight_length == 3)
+
+
+def state_valid(state):
+    """Check if the password with the given state satisfies the rules.
+
+    Args:
+      state (tuple): State of the password, see `START_STATE`.
+
+    Returns:
+      bool: True if the password has a straight and two pairs.
+
+    """
+    return state[4] and state[2] == 2
+
+
+@functools.lru_cache(maxsize=None)
+def can_complete(state, free):
+    """Check if a password can be made valid by appending `free` letters.
+
+    Args:
+      state (tuple): State of the password so far, see `START_STATE`.
+      free (int): Number of letters left to append.
+
+    Returns:
+      bool: True if some suffix makes the password valid.
+
+    """
+    if state_valid(state) or free >= ALWAYS_COMPLETABLE:
+        return True
+    return free > 0 and any(can_complete(advance(state, letter), free - 1)
+                            for letter in ALLOWED_LETTERS)
+
+
+def valid_suffixes(state, free):
+    """Generate the suffixes which make a password valid, in order.
+
+    Letters which can't lead to a valid password are skipped
+    along with every suffix starting with them.
+
+    Args:
+      state (tuple): State of the password so far, see `START_STATE`.
+      free (int): Length of the suffixes.
+
+    Yields:
+      str: Suffixes, in lexicographic order.
+
+    """
+    if not free:
+        if state_valid(state):
+            yield ''
+        return
+
+    for letter in ALLOWED_LETTERS:
+        next_state = advance(state, letter)
+        if can_complete(next_state, free - 1):
+            for suffix in valid_suffixes(next_state, free - 1):
+                yield letter + suffix
+
+
+def valid_passwords(password):
+    """Generate all the valid passwords after `password`, in order.
+
+    The password is a base-23 number over the allowed letters. Going from
+    the rightmost letter to the left, each letter is increased, and whole
+    ranges of suffixes are skipped if they can't make the password valid.
+
+    Args:
+      password (str): Current password.
+
+    Yields:
+      str: Valid passwords of the same length, in lexicographic order.
+
+    Examples:
+      >>> list(islice(valid_passwords('abcdffaa'), 3))
+      ['abcdffbb', 'abcdffcc', 'abcdffdd']
+
+    """
+    # prefixes with invalid letters can't be kept
+    end = min((password.index(c) + 1 for c in 'iol' if c in password),
+              default=len(password))
+
+    states = [START_STATE]
+    for letter in password[:end]:
+        states.append(advance(states[-1], letter))
+
+    for position in range(end - 1, -1, -1):
+        free = len(password) - position - 1
+        for letter in ALLOWED_LETTERS:
+            if letter > password[position]:
+                prefix = password[:position] + letter
+                state = advance(states[position], letter)
+                for suffix in valid_suffixes(state, free):
+                    yield prefix + suffix
+
+
+def skip_to_valid_password(password):
+    """Find the next valid password without trying every string.
+
+    Args:
+      password (str): Current password.
+
+    Returns:
+      str: Next valid password, or None if there is none of the same length.
+
+    Examples:
+      >>> skip_to_valid_password('abcdefgh')
+      'abcdffaa'
+      >>> skip_to_valid_password('ghijklmn')
+      'ghjaabcc'
+
+    """
+    return next(valid_passwords(password), None)
+
+
+def valid_password_batches(password, batch_size=1000):
+    """Generate the valid passwords after `password` in batches.
+
+    Args:
+      password (str): Current password.
+      batch_size (int): Number of passwords in each batch.
+
+    Yields:
+      list of str: Valid passwords, in lexicographic order.
+        Only the last batch may be shorter than `batch_size`.
+
+    """
+    passwords = valid_passwords(password)
+    while True:
+        batch = list(islice(passwords, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+@functools.lru_cache(maxsize=None)
+def count_completions(state, free):
+    """Count the suffixes which make a password valid.
+
+    Args:
+      state (tuple): State of the password so far, see `START_STATE`.
+      free (int): Length of the suffixes.
+
+    Returns:
+      int: Number of suffixes.
+
+    """
+    if not free:
+        return int(state_valid(state))
+    return sum(count_completions(advance(state, letter), free - 1)
+               for letter in ALLOWED_LETTERS)
+
+
+def count_valid_below(password):
+    """Count the valid passwords which come before `password`.
+
+    Every letter smaller than the password's letter at some position,
+    after the same prefix, starts a whole block of strings which are
+    counted with :func:`count_completions`.
+
+    Args:
+      password (str)
+
+    Returns:
+      int: Number of valid passwords of the same length smaller than it.
+
+    Examples:
+      >>> count_valid_below('aaaaaabd')
+      1
+
+    """
+    count = 0
+    state = START_STATE
+    for position, current in enumerate(password):
+        free = len(password) - position - 1
+        for letter in ALLOWED_LETTERS:
+            if letter >= current:
+                break
+            count += count_completions(advance(state, letter), free)
+        if current not in ALLOWED_LETTERS:
+            break
+        state = advance(state, current)
+    return count
+
+
+def count_valid_passwords(low, high):
+    """Count the valid passwords between `low` and `high`, inclusive.
+
+    Args:
+      low (str)
+      high (str): A password of the same length as `low`.
+
+    Returns:
+      int: Number of valid passwords.
+
+    Examples:
+      >>> count_valid_passwords('abcdffaa', 'abcdffzz')
+      23
+
+    """
+    count = count_valid_below(high) - count_valid_below(low)
+    if not set('iol') & set(high) and valid(high):
+        count += 1
+    return count
+
+
 def main():
     import sys
 
     password = sys.argv[1]
-    next_letters = create_next_letters()
 
     for _ in range(2):
-        password = next_valid_password(password, next_letters)
+        password = skip_to_valid_password(password)
         print(password)
 
 
@@ -16,6 +16,22 @@ with the value "red".
 
 """
 import json
+import re
+from array import array
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(
+    rb'[ \t\n\r]*(?:'
+    rb'("(?:[^"\\\x00-\x1f]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*")'  # string
+    rb'|(-?(?:0|[1-9]\d*))(?![\d.eE])'  # integer
+    rb'|(-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?)(?![\d.eE+-])'  # number
+    rb'|([][{}])'  # start or end of a container
+    rb'|(true|false|null)'  # literal
+    rb'|([,:])'  # separator
+    rb')'
+)
+# the opening bracket each closing bracket must match
+CLOSING = {b'}': b'{', b']': b'['}
 
 
 def all_nums(data, ignore_reds=False):
@@ -45,14 +61,302 @@ def all_nums(data, ignore_reds=False):
                 yield from all_nums(value, ignore_reds)
 
 
+def tokens(f, chunk_size=1 << 16):
+    """Split a JSON document into tokens, reading it in chunks.
+
+    Tokens which could continue past the end of a chunk
+    are held back until the next chunk is read.
+
+    Args:
+      f (binary file): The JSON document.
+      chunk_size (int): Number of bytes read at once.
+
+    Yields:
+      tuple: (string, integer, number, bracket, literal, separator),
+        with only the matching item set, as bytes.
+
+    Examples:
+      >>> import io
+      >>> list(tokens(io.BytesIO(b'{"a": [12, "b"]}'), chunk_size=3))
+      ... # doctest: +NORMALIZE_WHITESPACE
+      [(None, None, None, b'{', None, None),
+       (b'"a"', None, None, None, None, None),
+       (None, None, None, None, None, b':'),
+       (None, None, None, b'[', None, None),
+       (None, b'12', None, None, None, None),
+       (None, None, None, None, None, b','),
+       (b'"b"', None, None, None, None, None),
+       (None, None, None, b']', None, None),
+       (None, None, None, b'}', None, None)]
+
+    """
+    buffer = b''
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        buffer += chunk
+        position = 0
+        while True:
+            match = TOKEN_PATTERN.match(buffer, position)
+            if not match or match.end() == len(buffer):
+                break
+            yield match.groups()
+            position = match.end()
+        buffer = buffer[position:]
+
+    position = 0
+    while buffer[position:].strip(b' \t\n\r'):
+        match = TOKEN_PATTERN.match(buffer, position)
+        if not match:
+            raise ValueError('invalid JSON: {!r}'.format(buffer[position:]))
+        yield match.groups()
+        position = match.end()
+
+
+def events(f, chunk_size=1 << 16):
+    """Walk the structure of a JSON document without loading it.
+
+    Args:
+      f (binary file): The JSON document.
+      chunk_size (int): Number of bytes read at once.
+
+    Yields:
+      tuple: (event, token), where event is one of:
+        'open' or 'close', with the bracket as the token;
+        'key', with the quoted key as the token;
+        'value', with an int for integers, the quoted bytes for strings,
+        and None for other numbers and literals.
+
+    Raises:
+      ValueError: If the document is not valid JSON.
+
+    Examples:
+      >>> import io
+      >>> list(events(io.BytesIO(b'{"a": [12, "b", null]}')))
+      ... # doctest: +NORMALIZE_WHITESPACE
+      [('open', b'{'), ('key', b'"a"'), ('open', b'['), ('value', 12),
+       ('value', b'"b"'), ('value', None), ('close', b']'), ('close', b'}')]
+      >>> list(events(io.BytesIO(b'[1]]')))
+      Traceback (most recent call last):
+        ...
+      ValueError: invalid JSON: unexpected b']'
+      >>> list(events(io.BytesIO(b'{"a": [1, 2')))
+      Traceback (most recent call last):
+        ...
+      ValueError: invalid JSON: unexpected end of document
+
+    """
+    # brackets of the open containers, with None for the top level
+    stack = [None]
+    # what comes next: 'value', 'key', ':', ',' or 'end', and if
+    # the container may be closed instead
+    expect = 'value'
+    closable = False
+
+    for string, integer, number, bracket, literal, separator in tokens(
+            f, chunk_size):
+        if bracket in (b'}', b']'):
+            if not closable or stack[-1] != CLOSING[bracket]:
+                raise ValueError('invalid JSON: unexpected {!r}'.format(
+                    bracket))
+            stack.pop()
+            yield 'close', bracket
+        elif separator:
+            if separator.decode() != expect:
+                raise ValueError('invalid JSON: unexpected {!r}'.format(
+                    separator))
+            is_object = stack[-1] == b'{'
+            expect = 'key' if separator == b',' and is_object else 'value'
+            closable = False
+            continue
+        elif expect == 'key':
+            if not string:
+                raise ValueError('invalid JSON: expected a key, got {!r}'
+                                 .format(integer or number or bracket or
+                                         literal))
+            expect, closable = ':', False
+            yield 'key', string
+            continue
+        elif expect != 'value':
+            raise ValueError('invalid JSON: unexpected {!r}'.format(
+                string or integer or number or bracket or literal))
+        elif bracket:
+            stack.append(bracket)
+            expect = 'key' if bracket == b'{' else 'value'
+            closable = True
+            yield 'open', bracket
+            continue
+        elif integer:
+            yield 'value', int(integer)
+        elif string:
+            yield 'value', string
+        else:
+            yield 'value', None
+        # a value was read
+        if stack[-1] is None:
+            expect, closable = 'end', False
+        else:
+            expect, closable = ',', True
+
+    if expect != 'end':
+        raise ValueError('invalid JSON: unexpected end of document')
+
+
+def stream_sums(f, exclude='red', chunk_size=1 << 16):
+    """Sum the integers in a JSON document without loading it.
+
+    An explicit stack holds the partial sum of every open container,
+    which is added to its parent's sum when the container ends,
+    unless it's an object with a property with the value `exclude`.
+
+    Args:
+      f (binary file): The JSON document.
+      exclude (str): Value which excludes the objects containing it.
+      chunk_size (int): Number of bytes read at once.
+
+    Returns:
+      tuple of ints: Sum of all the integers,
+        and sum of the integers outside of excluded objects.
+
+    Examples:
+      >>> import io
+      >>> stream_sums(io.BytesIO(b'[1,{"c":"red","b":2},3]'))
+      (6, 4)
+      >>> stream_sums(io.BytesIO(b'{"d":"red","e":[1,2,3,4],"f":5}'))
+      (15, 0)
+      >>> stream_sums(io.BytesIO(b'[1,"red",5]'))
+      (6, 6)
+      >>> stream_sums(io.BytesIO(b'{"red":1}'))
+      (1, 1)
+
+    """
+    excluded = b'"' + exclude.encode() + b'"'
+    total = 0
+    # [is object, partial sum, excluded]
+    stack = [[False, 0, False]]
+
+    for event, token in events(f, chunk_size):
+        if event == 'value':
+            frame = stack[-1]
+            if isinstance(token, int):
+                total += token
+                frame[1] += token
+            elif token and frame[0] and (token == excluded or
+                                         b'\\' in token and
+                                         json.loads(token) == exclude):
+                frame[2] = True
+        elif event == 'open':
+            stack.append([token == b'{', 0, False])
+        elif event == 'close':
+            is_object, partial, is_excluded = stack.pop()
+            if not is_excluded:
+                stack[-1][1] += partial
+
+    return total, stack[0][1]
+
+
+class SubtreeIndex:
+    """Sums of the integers inside every object of a JSON document.
+
+    Objects are numbered in the order they start, so the objects inside
+    object `i` are exactly `i + 1` to `ends[i]`. Together with a map of
+    the objects having each property value, this answers any exclusion
+    query without reading the document again.
+
+    Examples:
+      >>> import io
+      >>> index = SubtreeIndex(io.BytesIO(
+      ...     b'[1,{"c":"red","b":{"x":"blue","y":2}},{"z":"blue","w":4}]'))
+      >>> index.total, index.sum_excluding('red'), index.sum_excluding('blue')
+      (7, 5, 1)
+      >>> index.sum_excluding('red', 'blue'), index.sum_excluding('green')
+      (1, 7)
+      >>> SubtreeIndex(io.BytesIO(b'[{"a": 1180591620717411303424}, 1]')).sums
+      [1180591620717411303424]
+      >>> SubtreeIndex(io.BytesIO(b'[{"a": 1]'))
+      Traceback (most recent call last):
+        ...
+      ValueError: invalid JSON: unexpected b']'
+
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        """Index a JSON document in one pass.
+
+        Args:
+          f (binary file): The JSON document.
+          chunk_size (int): Number of bytes read at once.
+
+        Raises:
+          ValueError: If the document is not valid JSON.
+
+        """
+        self.sums = array('q')
+        self.ends = array('q')
+        self.objects_with = defaultdict(list)
+        self.total = 0
+
+        # [object number or None for arrays, partial sum]
+        stack = [[None, 0]]
+        for event, token in events(f, chunk_size):
+            if event == 'value':
+                frame = stack[-1]
+                if isinstance(token, int):
+                    self.total += token
+                    frame[1] += token
+                elif token and frame[0] is not None:
+                    objects = self.objects_with[json.loads(token)]
+                    if not objects or objects[-1] != frame[0]:
+                        objects.append(frame[0])
+            elif event == 'open':
+                if token == b'{':
+                    stack.append([len(self.sums), 0])
+                    self.sums.append(0)
+                    self.ends.append(0)
+                else:
+                    stack.append([None, 0])
+            elif event == 'close':
+                closed, partial = stack.pop()
+                if closed is not None:
+                    try:
+                        self.sums[closed] = partial
+                    except OverflowError:
+                        # keep Python ints once a sum is too big for 64 bits
+                        self.sums = list(self.sums)
+                        self.sums[closed] = partial
+                    self.ends[closed] = len(self.sums) - 1
+                stack[-1][1] += partial
+
+    def sum_excluding(self, *values):
+        """Sum the integers outside of objects with any of the `values`.
+
+        Only the outermost excluded objects are subtracted,
+        since they already contain the others.
+
+        Args:
+          values (str): Property values which exclude an object.
+
+        Returns:
+          int: Sum of the remaining integers.
+
+        """
+        excluded = sorted({number for value in values
+                           for number in self.objects_with.get(value, ())})
+        total = self.total
+        end = -1
+        for number in excluded:
+            if number > end:
+                total -= self.sums[number]
+                end = self.ends[number]
+        return total
+
+
 def main():
     import sys
 
-    with open(sys.argv[1]) as f:
-        data = json.load(f)
+    with open(sys.argv[1], 'rb') as f:
+        total, without_reds = stream_sums(f)
 
-    print(sum(all_nums(data)))
-    print(sum(all_nums(data, ignore_reds=True)))
+    print(total)
+    print(without_reds)
 
 
 if __name__ == '__main__':
@@ -107,15 +107,174 @@ def happiness_total(arrangement, happiness):
     )
 
 
+def score_matrix(happiness):
+    """Index the people and build a symmetric matrix of pair scores.
+
+    Args:
+      happiness (dict of dict): Mapping  of each persons happiness
+        if seated next to each of the others.
+
+    Returns:
+      tuple: (people, matrix), where `matrix[i][j]` is the total change
+        in happiness of `people[i]` and `people[j]` sitting together.
+
+    Examples:
+      >>> score_matrix({'A': {'B': 3}, 'B': {'A': -1}})
+      (['A', 'B'], [[0, 2], [2, 0]])
+
+    """
+    people = list(happiness)
+    matrix = [[happiness[person1].get(person2, 0) +
+               happiness[person2].get(person1, 0)
+               for person2 in people]
+              for person1 in people]
+    return people, matrix
+
+
+def best_seatings(matrix):
+    """Find the best seating totals with bitmask DP.
+
+    `best[seated, last]` is the best total of a row of people starting
+    with person 0, seating the other people in the bitmask `seated`
+    and ending with `last`. Closing the best row gives the best table.
+
+    Someone with zero scores sits between the two ends of an open row,
+    which is two rows from person 0 joined back to back. So the best table
+    including them comes from the same DP, by pairing up complementary rows.
+
+    Args:
+      matrix (list of lists): Pair scores, see `score_matrix`.
+
+    Returns:
+      tuple of ints: Best total of the table, and of the table
+        with one more person who is indifferent to everyone.
+
+    Examples:
+      >>> best_seatings([[0, 137, -81, 44],
+      ...                [137, 0, 53, -70],
+      ...                [-81, 53, 0, 96],
+      ...                [44, -70, 96, 0]])
+      (330, 286)
+
+    """
+    import numpy
+
+    n = len(matrix)
+    if n < 2:
+        return 0, 0
+    matrix = numpy.array(matrix, dtype=numpy.int64)
+    others = numpy.arange(n - 1)
+    full = (1 << (n - 1)) - 1
+
+    seated_count = numpy.zeros(full + 1, dtype=numpy.int64)
+    for person in others:
+        seated_count[1 << person:2 << person] = seated_count[:1 << person] + 1
+    masks = numpy.arange(full + 1)
+
+    impossible = numpy.iinfo(numpy.int64).min // 2
+    best = numpy.full((full + 1, n - 1), impossible, dtype=numpy.int64)
+    best[1 << others, others] = matrix[0, 1:]
+    for size in range(2, n):
+        layer = masks[seated_count == size]
+        for last in others:
+            ends = layer[(layer >> last) & 1 == 1]
+            previous = best[ends ^ (1 << last)] + matrix[1:, last + 1]
+            best[ends, last] = previous.max(axis=1)
+
+    table = int((best[full] + matrix[1:, 0]).max())
+
+    rows = best.max(axis=1)
+    rows[0] = 0
+    with_indifferent = int((rows + rows[full ^ masks]).max())
+
+    return table, with_indifferent
+
+
+def heap_swaps(n):
+    """Generate the swaps which go through every permutation of `n` items.
+
+    This is the iterative version of Heap's algorithm.
+
+    Args:
+      n (int): Number of items.
+
+    Yields:
+      tuple: Positions (i, j) of the two items to swap, with i < j.
+
+    Examples:
+      >>> list(heap_swaps(3))
+      [(0, 1), (0, 2), (0, 1), (0, 2), (0, 1)]
+
+    """
+    counters = [0] * n
+    i = 1
+    while i < n:
+        if counters[i] < i:
+            yield (0 if i % 2 == 0 else counters[i]), i
+            counters[i] += 1
+            i = 1
+        else:
+            counters[i] = 0
+            i += 1
+
+
+def best_seating_by_swaps(matrix):
+    """Find the best seating total by trying every arrangement.
+
+    Person 0 is fixed, to skip rotations, and only arrangements where
+    their left neighbor comes before their right one are tried, to skip
+    mirror images. For each pair of neighbors, the people in between are
+    permuted one swap at a time, and the total is updated from the few
+    pairs the swap changes.
+
+    Args:
+      matrix (list of lists): Pair scores, see `score_matrix`.
+
+    Returns:
+      int: Best total of the table.
+
+    Examples:
+      >>> best_seating_by_swaps([[0, 137, -81, 44],
+      ...                        [137, 0, 53, -70],
+      ...                        [-81, 53, 0, 96],
+      ...                        [44, -70, 96, 0]])
+      330
+
+    """
+    n = len(matrix)
+    if n < 3:
+        return 2 * matrix[0][1] if n == 2 else 0
+
+    best = None
+    for left, right in itertools.combinations(range(1, n), 2):
+        row = [0, left]
+        row.extend(person for person in range(1, n)
+                   if person not in (left, right))
+        row.extend([right, 0])
+        total = sum(matrix[person1][person2]
+                    for person1, person2 in zip(row, row[1:]))
+        best = total if best is None else max(best, total)
+
+        # the people in between start at index 2 of the row
+        for i, j in heap_swaps(n - 3):
+            i, j = i + 2, j + 2
+            pairs = {i - 1, i, j - 1, j}
+            total -= sum(matrix[row[k]][row[k + 1]] for k in pairs)
+            row[i], row[j] = row[j], row[i]
+            total += sum(matrix[row[k]][row[k + 1]] for k in pairs)
+            best = max(best, total)
+
+    return best
+
+
 def main():
     import sys
 
     happiness = parse_file(sys.argv[1])
-    print(max(happiness_totals(happiness)))
+    _, matrix = score_matrix(happiness)
 
-    for person in happiness.copy():
-        happiness[person]['me'] = happiness['me'][person] = 0
-    print(max(happiness_totals(happiness)))
+    for total in best_seatings(matrix):
+        print(total)
 
 
 if __name__ == '__main__':
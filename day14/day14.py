@@ -15,8 +15,11 @@ At the end of each second, Santa awards one point to the reindeer currently
 in the lead. What is the score of the winning reindeer?
 
 """
-import re
+import functools
 import itertools
+import math
+import re
+from fractions import Fraction
 
 
 class Reindeer:
@@ -103,17 +106,277 @@ def leaders(herd):
     return itertools.takewhile(lambda d: d.traveled == leader_score, herd)
 
 
+def phase_end(deer, second):
+    """Find the last second of the reindeer's current flight or rest.
+
+    Args:
+      deer (Reindeer)
+      second (int): Current second of the race, counting from 1.
+
+    Returns:
+      int: Last second the reindeer keeps flying or resting.
+
+    Examples:
+      >>> phase_end(Reindeer(14, 10, 127), 1)
+      10
+      >>> phase_end(Reindeer(14, 10, 127), 11)
+      137
+
+    """
+    offset = (second - 1) % deer.cycle_duration
+    if offset < deer.travels:
+        return second + deer.travels - 1 - offset
+    return second + deer.cycle_duration - 1 - offset
+
+
+def lead_stretches(herd, start=1):
+    """Generate the stretches of the race where the leaders don't change.
+
+    While no reindeer starts or stops flying, the leaders only change when
+    a faster reindeer catches up with them, which happens at a time that
+    can be calculated.
+
+    Args:
+      herd (list): A list of all reindeer.
+      start (int): First second of the first stretch, counting from 1.
+
+    Yields:
+      tuple: (last, leading), the last second of the stretch, and the
+        indices of the reindeer in the lead. Each stretch starts right
+        after the previous one.
+
+    Examples:
+      >>> herd = [Reindeer(14, 10, 127), Reindeer(16, 11, 162)]
+      >>> list(itertools.islice(lead_stretches(herd), 5))
+      [(10, [1]), (11, [1]), (137, [1]), (139, [1]), (147, [0])]
+
+    """
+    second = start
+    positions = [distance_traveled(deer.speed, deer.travels,
+                                   deer.cycle_duration - deer.travels,
+                                   second)
+                 for deer in herd]
+    velocities = [deer.speed if deer.flying(second - 1) else 0
+                  for deer in herd]
+    ends = [phase_end(deer, second) for deer in herd]
+
+    while True:
+        end = min(ends)
+        while second <= end:
+            lead = max(positions)
+            leading = [i for i, position in enumerate(positions)
+                       if position == lead]
+            leading_velocities = {velocities[i] for i in leading}
+
+            last = end
+            if len(leading_velocities) > 1:
+                # the slower leaders fall behind right away
+                last = second
+            else:
+                velocity, = leading_velocities
+                for i, position in enumerate(positions):
+                    if velocities[i] > velocity:
+                        catch_up = -((position - lead) //
+                                     (velocities[i] - velocity))
+                        last = min(last, second + catch_up - 1)
+
+            yield last, leading
+            elapsed = last - second + 1
+            positions = [position + velocity * elapsed
+                         for position, velocity in zip(positions, velocities)]
+            second = last + 1
+
+        for i, deer in enumerate(herd):
+            if ends[i] == end:
+                # the positions were moved into this second at the old speed
+                velocity = deer.speed if deer.flying(second - 1) else 0
+                positions[i] += velocity - velocities[i]
+                velocities[i] = velocity
+                ends[i] = phase_end(deer, second)
+
+
+def settled_leader(herd):
+    """Find when the reindeer with the best average speed takes the lead
+    for good.
+
+    Each reindeer is never behind its average speed times the time, and
+    never ahead of it by more than the distance it gains during a flight,
+    so a reindeer with a strictly best average speed eventually stays ahead.
+
+    Args:
+      herd (list): A list of all reindeer.
+
+    Returns:
+      tuple: (index, second), where the reindeer `index` is the only one
+        in the lead from `second` on, or None if there is no such reindeer.
+
+    Examples:
+      >>> settled_leader([Reindeer(14, 10, 127), Reindeer(16, 11, 162)])
+      (0, 36169)
+
+    """
+    averages = [Fraction(deer.speed * deer.travels, deer.cycle_duration)
+                for deer in herd]
+    best = max(averages)
+    if averages.count(best) > 1:
+        return None
+
+    leader = averages.index(best)
+    second = 1
+    for deer, average in zip(herd, averages):
+        if average != best:
+            rests = deer.cycle_duration - deer.travels
+            ahead = Fraction(deer.speed * deer.travels * rests,
+                             deer.cycle_duration)
+            second = max(second, ahead // (best - average) + 1)
+    return leader, int(second)
+
+
+def stable_period(herd):
+    """Find when the leaders start to repeat with the cycles of the herd.
+
+    After a period which is a multiple of every cycle, every reindeer is
+    back in the same state, having traveled a fixed distance further.
+    Once the differences between those distances outweigh the distances
+    traveled within a period, the leaders are the same in every period.
+
+    Args:
+      herd (list): A list of all reindeer.
+
+    Returns:
+      tuple: (period, periods), the length of the period, and the number
+        of periods after which the leaders repeat.
+
+    Examples:
+      >>> stable_period([Reindeer(2, 1, 1), Reindeer(1, 1, 0)])
+      (2, 0)
+      >>> stable_period([Reindeer(2, 1, 1), Reindeer(1, 2, 1)])
+      (6, 4)
+
+    """
+    period = functools.reduce(
+        lambda a, b: a * b // math.gcd(a, b),
+        (deer.cycle_duration for deer in herd))
+    distances = [period // deer.cycle_duration * deer.travels * deer.speed
+                 for deer in herd]
+    gaps = {abs(a - b) for a, b in itertools.combinations(distances, 2)}
+    gaps.discard(0)
+    if not gaps:
+        return period, 0
+    return period, max(distances) // min(gaps) + 1
+
+
+def event_race(herd, duration):
+    """Race the reindeer, jumping from one change of leaders to the next.
+
+    Points are awarded for whole stretches of :func:`lead_stretches` at once.
+    Once a reindeer has taken the lead for good, or the leaders repeat
+    in every period of the herd's cycles, the remaining points are
+    calculated without racing any further.
+
+    Args:
+      herd (list): A list of all reindeer. Their distances and scores
+        are updated.
+      duration (int): Length of the race in seconds.
+
+    Examples:
+      >>> herd = [Reindeer(14, 10, 127), Reindeer(16, 11, 162)]
+      >>> event_race(herd, 1000)
+      >>> [(deer.traveled, deer.score) for deer in herd]
+      [(1120, 312), (1056, 689)]
+      >>> herd = [Reindeer(14, 10, 127), Reindeer(16, 11, 162)]
+      >>> event_race(herd, 10 ** 9)
+      >>> [(deer.traveled, deer.score) for deer in herd]
+      [(1021897940, 999992527), (1017341072, 7925)]
+
+    """
+    scores = [0] * len(herd)
+
+    def award(start, stop):
+        """Award the points for the seconds `start` to `stop`."""
+        second = start
+        for last, leading in lead_stretches(herd, start):
+            if second > stop:
+                return
+            last = min(last, stop)
+            for i in leading:
+                scores[i] += last - second + 1
+            second = last + 1
+
+    settled = settled_leader(herd)
+    period, periods = stable_period(herd)
+    if settled and settled[1] <= duration:
+        leader, second = settled
+        award(1, second - 1)
+        scores[leader] += duration - second + 1
+    elif (periods + 1) * period <= duration:
+        start = periods * period
+        award(1, start)
+        before = scores[:]
+        award(start + 1, start + period)
+        repeats, left = divmod(duration - start, period)
+        scores = [score + (score - old) * (repeats - 1)
+                  for score, old in zip(scores, before)]
+        award(duration - left + 1, duration)
+    else:
+        award(1, duration)
+
+    for deer, score in zip(herd, scores):
+        deer.score += score
+        deer.traveled = distance_traveled(deer.speed, deer.travels,
+                                          deer.cycle_duration - deer.travels,
+                                          duration)
+
+
+def matrix_race(herd, duration, chunk_size=1 << 16):
+    """Race the reindeer with NumPy, a chunk of seconds at a time.
+
+    For each chunk, a herd-by-time matrix marks when each reindeer flies.
+    Its cumulative sum gives their positions, and comparing them to the
+    maximum position of each second gives the leaders.
+
+    Args:
+      herd (list): A list of all reindeer. Their distances and scores
+        are updated.
+      duration (int): Length of the race in seconds.
+      chunk_size (int): Number of seconds in each chunk, which bounds
+        the size of the matrices.
+
+    Examples:
+      >>> herd = [Reindeer(14, 10, 127), Reindeer(16, 11, 162)]
+      >>> matrix_race(herd, 1000, chunk_size=64)
+      >>> [(deer.traveled, deer.score) for deer in herd]
+      [(1120, 312), (1056, 689)]
+
+    """
+    import numpy
+
+    speeds = numpy.array([[deer.speed] for deer in herd], dtype=numpy.int64)
+    travels = numpy.array([[deer.travels] for deer in herd])
+    cycles = numpy.array([[deer.cycle_duration] for deer in herd])
+
+    traveled = numpy.zeros((len(herd), 1), dtype=numpy.int64)
+    scores = numpy.zeros(len(herd), dtype=numpy.int64)
+
+    for start in range(0, duration, chunk_size):
+        times = numpy.arange(start, min(start + chunk_size, duration))
+        flying = times % cycles < travels
+        positions = traveled + numpy.cumsum(flying * speeds, axis=1)
+        scores += (positions == positions.max(axis=0)).sum(axis=1)
+        traveled = positions[:, -1:]
+
+    for deer, distance, score in zip(herd, traveled[:, 0], scores):
+        deer.traveled = int(distance)
+        deer.score += int(score)
+
+
 def main():
     import sys
 
     with open(sys.argv[1]) as f:
         herd = [Reindeer.from_string(line) for line in f]
 
-    for time in range(int(sys.argv[2])):
-        for deer in herd:
-            deer.move(time)
-        for leader in leaders(herd):
-            leader.score += 1
+    event_race(herd, int(sys.argv[2]))
 
     print(max(deer.traveled for deer in herd))
     print(max(deer.score for deer in herd))